@@ -0,0 +1,137 @@
+import numpy as np
+import ugradio
+import json
+import os
+import sys
+import time
+from newdata import power_spectrum, freq_axis, check_levels, HI_FREQ, SAMPLE_RATE, NSAMPLES, N_BLOCKS, OUT_DIR
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "scripts"))
+import autogain
+
+STATE_FILE = "campaign.json"
+CAPTURE_NBLOCKS = 3          # blocks per capture_data call; only the last is kept
+
+def lo_sweep_plan(shifts=None, nblocks=N_BLOCKS):
+    """son/soff steps placing the line shift MHz above / below the LO for each shift."""
+    if shifts is None:
+        shifts = [round(0.5 + i*0.1, 1) for i in range(1, 10)]
+    plan = []
+    for shift in shifts:
+        plan.append((f"son_{shift}",  HI_FREQ - shift*1e6, nblocks))
+        plan.append((f"soff_{shift}", HI_FREQ + shift*1e6, nblocks))
+    return plan
+
+def load_plan(path):
+    """Reads a JSON list of [label, lo_freq, nblocks] steps."""
+    with open(path) as f:
+        return [(str(label), float(lo), int(n)) for label, lo, n in json.load(f)]
+
+def load_state(out_dir):
+    path = os.path.join(out_dir, STATE_FILE)
+    if not os.path.exists(path):
+        return {"done": {}}
+    with open(path) as f:
+        return json.load(f)
+
+def save_state(state, out_dir):
+    path = os.path.join(out_dir, STATE_FILE)
+    with open(path + ".tmp", "w") as f:
+        json.dump(state, f, indent=1)
+    os.replace(path + ".tmp", path)
+
+def is_done(state, step, out_dir):
+    """True if this exact step (label, LO and nblocks) finished and its file is still there."""
+    label, lo_freq, nblocks = step
+    st = state["done"].get(label)
+    return (st is not None and st["lo_freq"] == lo_freq and st["nblocks"] == nblocks
+            and os.path.exists(os.path.join(out_dir, f"{label}.npz")))
+
+def capture_step(s, label, lo_freq, nblocks, out_dir, gain):
+    """Retunes the open SDR and captures one step; the .npz is written atomically."""
+    print(f"\n[{label}] Tuning SDR (LO) to {lo_freq/1e6:.3f} MHz...")
+    s.center_freq = lo_freq
+
+    spectra = np.zeros((nblocks, NSAMPLES))
+    for i in range(nblocks):
+        try:
+            raw = s.capture_data(nblocks=CAPTURE_NBLOCKS, nsamples=NSAMPLES)
+            spectra[i] = power_spectrum(raw[-1])
+            if i == 0: check_levels(raw[-1])
+        except Exception as e:
+            print(f"  Error at block {i}: {e}")
+            spectra[i] = np.nan
+
+    fname = os.path.join(out_dir, f"{label}.npz")
+    tmp   = os.path.join(out_dir, f"{label}.tmp.npz")
+    np.savez(tmp, spectra=spectra, freqs_hz=freq_axis(lo_freq), lo_freq=lo_freq, gain=gain)
+    os.replace(tmp, fname)
+    print(f"  → Saved to {fname}")
+    return fname, int(np.isnan(spectra[:, 0]).sum())
+
+def run(plan, out_dir=OUT_DIR, gain="auto"):
+    """
+    Runs each (label, lo_freq, nblocks) step on a single SDR session,
+    checkpointing to out_dir/campaign.json after every step. Steps already
+    recorded there with the same LO and nblocks (and their file present) are
+    skipped, so rerunning the same plan resumes after a crash. With
+    gain="auto" the gain is ranged once at the first step and reused for the
+    whole campaign, including after a resume.
+    """
+    os.makedirs(out_dir, exist_ok=True)
+    state = load_state(out_dir)
+    todo  = [st for st in plan if not is_done(state, st, out_dir)]
+    if len(todo) < len(plan):
+        print(f"Resuming: {len(plan) - len(todo)} of {len(plan)} steps already done")
+    if gain == "auto":
+        gain = state.get("gain", "auto")
+    elif state["done"] and state.get("gain") not in (None, gain):
+        raise ValueError(f"{out_dir} was recorded at {state['gain']} dB, not {gain} dB")
+    if todo:
+        s = ugradio.sdr.SDR(center_freq=todo[0][1], sample_rate=SAMPLE_RATE,
+                            gain=40 if gain == "auto" else gain)
+        try:
+            if gain == "auto":
+                gain, _ = autogain.auto_gain(s, nsamples=NSAMPLES)
+            state["gain"] = gain
+            for label, lo_freq, nblocks in todo:
+                t0 = time.time()
+                fname, nbad = capture_step(s, label, lo_freq, nblocks, out_dir, gain)
+                dt = time.time() - t0
+                state["done"][label] = {"file": fname, "lo_freq": lo_freq, "nblocks": nblocks,
+                                        "bad_blocks": nbad, "seconds": dt, "finished": time.time()}
+                save_state(state, out_dir)
+        finally:
+            s.close()
+    summarize(plan, state, out_dir)
+    return state
+
+def summarize(plan, state, out_dir=OUT_DIR):
+    print(f"\n{'step':<14}{'LO (MHz)':>12}{'blocks':>8}{'bad':>5}{'sec':>9}{'blk/s':>8}{'Msamp/s':>9}")
+    total_t = total_b = 0
+    for step in plan:
+        label, lo_freq, nblocks = step
+        st = state["done"].get(label)
+        if not is_done(state, step, out_dir):
+            print(f"{label:<14}{lo_freq/1e6:>12.3f}{'— not run':>17}")
+            continue
+        rate = st["nblocks"] / st["seconds"]
+        print(f"{label:<14}{lo_freq/1e6:>12.3f}{st['nblocks']:>8}{st['bad_blocks']:>5}"
+              f"{st['seconds']:>9.1f}{rate:>8.2f}{rate * CAPTURE_NBLOCKS * NSAMPLES / 1e6:>9.3f}")
+        total_t += st["seconds"]
+        total_b += st["nblocks"]
+    if total_t:
+        print(f"{'total':<14}{'':>12}{total_b:>8}{'':>5}{total_t:>9.1f}{total_b/total_t:>8.2f}")
+
+if __name__ == "__main__":
+    import argparse
+    p = argparse.ArgumentParser()
+    p.add_argument("--plan",    default=None, help="JSON list of [label, lo_freq, nblocks]; default is the LO sweep")
+    p.add_argument("--nblocks", type=int, default=N_BLOCKS)
+    p.add_argument("--outdir",  default=OUT_DIR)
+    p.add_argument("--gain",    default="auto", help='SDR gain in dB, or "auto"')
+    args = p.parse_args()
+
+    plan = load_plan(args.plan) if args.plan else lo_sweep_plan(nblocks=args.nblocks)
+    gain = args.gain if args.gain == "auto" else float(args.gain)
+    run(plan, out_dir=args.outdir, gain=gain)
@@ -68,10 +68,7 @@ def capture_at(label, lo_freq, nblocks=N_BLOCKS):
     return fname
 
 if __name__ == "__main__":
-    os.makedirs(OUT_DIR, exist_ok=True)
-    # Perform Frequency Switching
-    for i in range(1, 10):
-        shift = 0.5 + i*0.1
-        capture_at(f"son_{shift}", HI_FREQ + shift*(1e6))
-        capture_at(f"soff_{shift}", HI_FREQ + shift*(1e6))
+    from campaign import run, lo_sweep_plan
+    # Perform Frequency Switching (resumable; see campaign.py)
+    run(lo_sweep_plan())
     print("\nDone. Use visualize.py to see the bandpass-corrected ratio.")
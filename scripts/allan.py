@@ -0,0 +1,120 @@
+import numpy as np
+import matplotlib.pyplot as plt
+
+SAMPLE_RATE = 2.4e6
+EDGE_FRAC   = 0.1            # band edges / DC left out of the channel median
+
+def block_time(d, tblock=None):
+    """Wall-clock seconds per stored block, from jd_start/jd_end when the file has them."""
+    if tblock is not None:
+        return tblock
+    if "jd_start" in d and "jd_end" in d:
+        return (float(d["jd_end"]) - float(d["jd_start"])) * 86400 / len(d["spectra"])
+    raise ValueError("File has no jd_start/jd_end; pass tblock (seconds per block)")
+
+def clean(spectra):
+    """Drops blocks that errored (NaN rows) and normalizes each channel to its mean."""
+    y = spectra[~np.isnan(spectra).any(axis=1)]
+    return y / y.mean(axis=0)
+
+def m_grid(nblocks, npts=30):
+    return np.unique(np.logspace(0, np.log10(nblocks // 2), npts).astype(int))
+
+def overlapping_avar(y, ms):
+    """
+    Overlapping Allan variance of y (nblocks, nchan) at each averaging factor
+    in ms, vectorized over channels with one cumulative sum.
+    Returns (len(ms), nchan).
+    """
+    c = np.vstack([np.zeros((1, y.shape[1])), np.cumsum(y, axis=0)])
+    out = np.empty((len(ms), y.shape[1]))
+    for j, m in enumerate(ms):
+        avg = (c[m:] - c[:-m]) / m                  # all length-m running means
+        d   = avg[m:] - avg[:-m]
+        out[j] = 0.5 * np.mean(d ** 2, axis=0)
+    return out
+
+def radiometer(ms, nsamples, rate=SAMPLE_RATE):
+    """Fractional variance 1/(dnu * t_int) for m blocks of nsamples each."""
+    dnu   = rate / nsamples
+    t_int = ms * nsamples / rate
+    return 1.0 / (dnu * t_int)
+
+def band_median(avar):
+    n = avar.shape[1]
+    lo, hi = int(EDGE_FRAC * n), int((1 - EDGE_FRAC) * n)
+    mid = np.r_[lo:n//2 - 2, n//2 + 3:hi]             # skip the DC bins
+    return np.nanmedian(avar[:, mid], axis=1)
+
+def analyze(spectra, tblock, nsamples=None, spectra_off=None):
+    """
+    With spectra_off, the analysis is of the normalized s_on - s_off difference.
+    Returns a dict with tau (s), measured band-median Allan variance, the
+    radiometer prediction (scaled to the white level at m=1), the optimal
+    integration time (Allan minimum) and the switching interval (longest tau
+    still within 2x of radiometer-limited).
+    """
+    if spectra_off is None:
+        y = clean(spectra)
+    else:
+        # The mean-normalized difference stands in for s_on/s_off: to first
+        # order it carries the same fractional drift, but unlike a ratio of
+        # single-block spectra (F(2,2), no finite variance) it is white with
+        # variance on + off at m=1, so the radiometer slope applies from there.
+        good = ~(np.isnan(spectra).any(axis=1) | np.isnan(spectra_off).any(axis=1))
+        y = clean(spectra[good]) - clean(spectra_off[good])
+    ms   = m_grid(len(y))
+    avar = band_median(overlapping_avar(y, ms))
+    white_level = avar[0]                             # window / ENBW sets the m=1 level
+    nsamples = nsamples or y.shape[1]
+    pred = radiometer(ms, nsamples) / radiometer(1, nsamples) * white_level
+    tau  = ms * tblock
+    white = avar <= 2 * pred
+    return {"tau": tau, "avar": avar, "radiometer": pred,
+            "t_opt": tau[np.argmin(avar)],
+            "t_switch": tau[max(np.argmin(white) - 1, 0)] if not white.all() else tau[-1],
+            "white_level": white_level}
+
+def report(name, r):
+    print(f"\n[{name}] white level (m=1) = {r['white_level']:.3e}")
+    print(f"  optimal integration   = {r['t_opt']:.1f} s")
+    print(f"  switch faster than    = {r['t_switch']:.1f} s")
+    if r["t_opt"] >= r["tau"][-1]:
+        print("  (still radiometer-limited at the longest tau — no drift knee yet)")
+
+def plot(results, fname="allan.png"):
+    fig, ax = plt.subplots(1, 1, figsize=(8, 6))
+    for name, r in results.items():
+        line, = ax.loglog(r["tau"], r["avar"], "o-", ms=3, label=name)
+        ax.loglog(r["tau"], r["radiometer"], "--", color=line.get_color(), alpha=0.6)
+        ax.axvline(r["t_opt"], color=line.get_color(), ls=":", alpha=0.6)
+    ax.set_xlabel("tau (s)")
+    ax.set_ylabel("Allan variance (fractional)")
+    ax.set_title("Overlapping Allan Variance  (dashed = radiometer equation)")
+    ax.legend()
+    ax.grid(True, which="both", alpha=0.3)
+    plt.tight_layout()
+    plt.savefig(fname, dpi=150)
+    print(f"Saved: {fname}")
+
+if __name__ == "__main__":
+    import argparse
+    p = argparse.ArgumentParser()
+    p.add_argument("--son",    required=True, help="path to son .npz file")
+    p.add_argument("--soff",   default=None,  help="path to soff .npz file (adds s_on - s_off)")
+    p.add_argument("--tblock", type=float, default=None, help="seconds per block if the file has no JD")
+    args = p.parse_args()
+
+    d_on = np.load(args.son)
+    tb   = block_time(d_on, args.tblock)
+    results = {"s_on": analyze(d_on["spectra"], tb)}
+
+    if args.soff:
+        d_off = np.load(args.soff)
+        n = min(len(d_on["spectra"]), len(d_off["spectra"]))
+        results["s_off"] = analyze(d_off["spectra"], block_time(d_off, args.tblock))
+        results["s_on - s_off"] = analyze(d_on["spectra"][:n], tb, spectra_off=d_off["spectra"][:n])
+
+    for name, r in results.items():
+        report(name, r)
+    plot(results)
@@ -0,0 +1,60 @@
+import numpy as np
+
+# R820T tuner gain table (dB), used if the SDR does not report its own
+RTL_GAINS   = [0.0, 0.9, 1.4, 2.7, 3.7, 7.7, 8.7, 12.5, 14.4, 15.7, 16.6, 19.7,
+               20.7, 22.9, 25.4, 28.0, 29.7, 32.8, 33.8, 36.4, 37.2, 38.6, 40.2,
+               42.1, 43.4, 43.9, 44.5, 48.0, 49.6]
+TARGET_STD  = 0.1            # of ADC full scale (±1)
+MAX_CLIP    = 1e-3           # fraction of samples allowed at full scale
+CLIP_LEVEL  = 0.99
+MIN_STD     = 0.005          # below this the 8-bit ADC is heavily quantized
+NSAMPLES    = 2048
+
+def level_stats(iq):
+    """RMS and clipping fraction of one IQ block, against ADC full scale."""
+    x = np.concatenate([iq.real, iq.imag])
+    return float(x.std()), float(np.mean(np.abs(x) >= CLIP_LEVEL))
+
+def gain_table(s):
+    gains = getattr(s, "valid_gains_db", None)
+    return sorted(gains) if gains else list(RTL_GAINS)
+
+def probe(s, gain, nsamples=NSAMPLES):
+    """Sets the gain and takes one short capture; the first block is discarded as stale."""
+    s.gain = gain
+    raw = s.capture_data(nblocks=2, nsamples=nsamples)
+    return level_stats(raw[-1])
+
+def auto_gain(s, target_std=TARGET_STD, max_clip=MAX_CLIP, nsamples=NSAMPLES):
+    """
+    Bisects the gain table for the highest gain whose RMS stays at or under
+    target_std without clipping. Level vs gain is monotonic, so this needs
+    ~log2(len(table)) captures. Leaves the SDR at the chosen gain.
+    """
+    gains = gain_table(s)
+    seen  = {}
+
+    def ok(i):
+        if i not in seen:
+            seen[i] = probe(s, gains[i], nsamples)
+        std, clip = seen[i]
+        return std <= target_std and clip <= max_clip
+
+    lo, hi = 0, len(gains) - 1
+    if not ok(lo):
+        print(f"  !! Clipping even at {gains[lo]} dB — add attenuation")
+    else:
+        while lo < hi:
+            mid = (lo + hi + 1) // 2
+            if ok(mid):
+                lo = mid
+            else:
+                hi = mid - 1
+
+    gain = gains[lo]
+    s.gain = gain
+    std, clip = seen[lo]
+    print(f"  Auto gain: {gain} dB  std={std:.4f}  clip={clip:.2e}  ({len(seen)} captures)")
+    if std < MIN_STD:
+        print("  !! Heavily quantized even at max gain")
+    return gain, {"level_std": std, "clip_frac": clip, "gain_probes": len(seen)}
@@ -0,0 +1,118 @@
+import numpy as np
+import os
+
+T_HOT      = 300.0           # K, horn filled with people
+T_COLD     = 10.0            # K, zenith sky near 1420 MHz
+CAL_CACHE  = os.path.join("data", "cal_cache.npz")
+LO_TOL     = 1e6             # Hz, max cal-to-observation LO offset (bandpass ~ fixed in RF)
+
+def solve(s_cold, s_hot, t_hot=T_HOT, t_cold=T_COLD):
+    """Per-channel gain (power/K) and Tsys (K) from a cold/hot pair of block spectra."""
+    p_cold = np.nanmean(s_cold, axis=0)
+    p_hot  = np.nanmean(s_hot,  axis=0)
+    gain   = (p_hot - p_cold) / (t_hot - t_cold)
+    gain[gain <= 0] = np.nan
+    tsys   = p_cold / gain
+    return gain, tsys
+
+def solve_files(cold_path, hot_path, t_hot=T_HOT, t_cold=T_COLD):
+    """
+    Solve from scold/scal .npz files. Returns a cache entry stamped at the
+    mean jd_mid, with the SDR gain (dB), nsamples and LO the pair was taken at.
+    """
+    d_cold = np.load(cold_path)
+    d_hot  = np.load(hot_path)
+    if float(d_cold["gain"]) != float(d_hot["gain"]):
+        raise ValueError(f"scold ({float(d_cold['gain'])} dB) and scal ({float(d_hot['gain'])} dB) "
+                         "were taken at different SDR gains")
+    gain, tsys = solve(d_cold["spectra"], d_hot["spectra"], t_hot, t_cold)
+    return {"jd":          0.5 * (float(d_cold["jd_mid"]) + float(d_hot["jd_mid"])),
+            "gain":        gain,
+            "tsys":        tsys,
+            "sdr_gain":    float(d_cold["gain"]),
+            "nsamples":    int(d_cold["nsamples"]),
+            "center_freq": float(d_cold["center_freq"])}
+
+CACHE_COLS = ("jd", "gain", "tsys", "sdr_gain", "nsamples", "center_freq")
+
+def load_cache(path=CAL_CACHE):
+    """Returns a dict of CACHE_COLS arrays sorted by jd, or None if no cache exists yet."""
+    if not os.path.exists(path):
+        return None
+    d = np.load(path)
+    return {k: d[k] for k in CACHE_COLS}
+
+def add_to_cache(entry, path=CAL_CACHE):
+    """Appends one solve_files() entry to the cache, keeping it sorted by jd."""
+    cache = load_cache(path)
+    if cache is None:
+        cache = {k: np.asarray(entry[k])[None, ...] for k in CACHE_COLS}
+    else:
+        if cache["gain"].shape[1] != len(entry["gain"]):
+            raise ValueError(f"Channel count {len(entry['gain'])} does not match cache "
+                             f"({cache['gain'].shape[1]})")
+        cache = {k: np.concatenate([cache[k], np.asarray(entry[k])[None, ...]]) for k in CACHE_COLS}
+    order = np.argsort(cache["jd"])
+    os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+    np.savez(path, **{k: v[order] for k, v in cache.items()})
+    print(f"  → Cached calibration JD={entry['jd']:.6f} at {entry['sdr_gain']} dB "
+          f"({len(order)} solutions in {path})")
+
+def cached_sdr_gain(path=CAL_CACHE):
+    """SDR gain (dB) of the latest cached solution, or None if no cache exists yet."""
+    cache = load_cache(path)
+    return None if cache is None else float(cache["sdr_gain"][-1])
+
+def rescale(gain, from_db, to_db):
+    """Moves a power/K gain between SDR gain settings (uses the tuner's nominal dB table)."""
+    return gain * 10 ** ((to_db - from_db) / 10)
+
+def interpolate(jd_mid, cache, sdr_gain, nsamples, center_freq, lo_tol=LO_TOL):
+    """
+    Linearly interpolates gain/Tsys in time to jd_mid, clamping outside the
+    cache. Only solutions taken within lo_tol of center_freq are used, and
+    none in range is refused: a per-channel gain is not valid at another LO.
+    A solution taken at a different SDR gain is rescaled to the observation's
+    gain (dB) as a fallback, with a warning; a different channel count is
+    refused.
+    """
+    if int(cache["nsamples"][0]) != nsamples:
+        raise ValueError(f"Observation has {nsamples} channels, cache has {int(cache['nsamples'][0])}")
+    near = np.abs(cache["center_freq"] - center_freq) <= lo_tol
+    if not near.any():
+        raise ValueError(f"No calibration within {lo_tol/1e6:.1f} MHz of LO {center_freq/1e6:.3f} MHz "
+                         f"(cache has {sorted(set((cache['center_freq'] / 1e6).round(3).tolist()))} MHz)")
+    cache = {k: v[near] for k, v in cache.items()}
+    off = sorted(set(cache["sdr_gain"][cache["sdr_gain"] != sdr_gain].tolist()))
+    if off:
+        print(f"  !! Calibration at {off} dB rescaled to {sdr_gain} dB with the nominal "
+              "gain table — T_B is only as good as those steps")
+    jds   = cache["jd"]
+    gains = rescale(cache["gain"], cache["sdr_gain"][:, None], sdr_gain)
+    tsyss = cache["tsys"]
+    if len(jds) == 1 or jd_mid <= jds[0]:
+        return gains[0], tsyss[0]
+    if jd_mid >= jds[-1]:
+        return gains[-1], tsyss[-1]
+    i = np.searchsorted(jds, jd_mid)
+    w = (jd_mid - jds[i-1]) / (jds[i] - jds[i-1])
+    return ((1 - w) * gains[i-1] + w * gains[i],
+            (1 - w) * tsyss[i-1] + w * tsyss[i])
+
+def line_temperature(s_on, s_off, gain):
+    """Frequency-switched line in K: (s_on - s_off) / gain, per channel."""
+    return (s_on - s_off) / gain
+
+if __name__ == "__main__":
+    import argparse
+    p = argparse.ArgumentParser()
+    p.add_argument("--scold", required=True, help="path to scold .npz file")
+    p.add_argument("--scal",  required=True, help="path to scal .npz file")
+    p.add_argument("--cache", default=CAL_CACHE)
+    p.add_argument("--thot",  type=float, default=T_HOT)
+    p.add_argument("--tcold", type=float, default=T_COLD)
+    args = p.parse_args()
+
+    entry = solve_files(args.scold, args.scal, args.thot, args.tcold)
+    print(f"JD={entry['jd']:.6f}  median Tsys={np.nanmedian(entry['tsys']):.1f} K")
+    add_to_cache(entry, path=args.cache)
@@ -4,6 +4,9 @@ import ugradio.timing as timing
 import ugradio.doppler as doppler
 import os
 import time
+import calibration
+import autogain
+import iqbalance
 
 HI_FREQ     = 1400e6
 SAMPLE_RATE = 2.4e6
@@ -34,7 +37,8 @@ def check_levels(iq):
         print("  Levels OK")
 
 
-def measure(label, nblocks=N_BLOCKS, out_dir="data", lo_freq=1400e6):
+def measure(label, nblocks=N_BLOCKS, out_dir="data", lo_freq=1400e6, gain="auto",
+            iq_correct=True, iq_state=None, server=None, publish_every=10):
     os.makedirs(out_dir, exist_ok=True)
 
     jd_start  = timing.julian_date()
@@ -43,22 +47,62 @@ def measure(label, nblocks=N_BLOCKS, out_dir="data", lo_freq=1400e6):
 
     print(f"\n[{label}] UTC={ut_start}  LST={lst_start:.4f}h  JD={jd_start:.6f}")
 
-    s = make_sdr(center_freq=lo_freq)
+    if gain == "auto":
+        # measure at the calibrated gain when there is one, so T_B needs no dB rescaling
+        cached = calibration.cached_sdr_gain(os.path.join(out_dir, "cal_cache.npz"))
+        if cached is not None:
+            gain = cached
+            print(f"  Gain: {gain} dB (from calibration cache)")
+        else:
+            gain = "range"
+    if gain == "range":
+        s = make_sdr(center_freq=lo_freq)
+        gain, levels = autogain.auto_gain(s, nsamples=NSAMPLES)
+    else:
+        s = make_sdr(center_freq=lo_freq, gain=gain)
+        levels = None
     spectra = np.zeros((nblocks, NSAMPLES))
+    if iq_correct:
+        if iq_state is None:
+            iq_state = iqbalance.new_state()
+        nwarm = iqbalance.warmup_blocks(iq_state, NSAMPLES)
+        if nwarm:
+            print(f"  IQ warm-up: {nwarm} blocks")
+            iqbalance.update(iq_state, s.capture_data(nblocks=nwarm, nsamples=NSAMPLES))
+        iqbalance.freeze(iq_state)
 
     for i in range(nblocks):
         try:
             raw = s.capture_data(nblocks=1, nsamples=NSAMPLES)
-            spectra[i] = power_spectrum(raw[0])
+            iq  = raw[0]
+            if iq_correct:
+                iq = iqbalance.process(iq_state, iq, i)
+            spectra[i] = power_spectrum(iq)
             if i == 0:
                 check_levels(raw[0])
+                if levels is None:
+                    std, clip = autogain.level_stats(raw[0])
+                    levels = {"level_std": std, "clip_frac": clip, "gain_probes": 0}
         except Exception as e:
             print(f"  Block {i} error: {e} — NaN inserted")
             spectra[i] = np.nan
 
+        if server is not None and (i + 1) % publish_every == 0:
+            server.publish({"label": label, "block": i + 1, "nblocks": nblocks,
+                            "center_freq": lo_freq, "jd_start": jd_start,
+                            "lst_start": lst_start, "gain": gain},
+                           {"spectra": np.nanmean(spectra[:i+1], axis=0)[None, :],
+                            "freqs_hz": freq_axis()})
+
     s.close()
     jd_end = timing.julian_date()
 
+    iq_stats = iqbalance.summary(iq_state) if iq_correct else {}
+    if iq_stats:
+        print(f"  IQ: gain={iq_stats['iq_gain']:.4f}  phase={np.degrees(iq_stats['iq_phase']):.2f} deg")
+    if "irr_after_db" in iq_stats:
+        print(f"  IQ: held-out IRR {iq_stats['irr_before_db']:.1f} → {iq_stats['irr_after_db']:.1f} dB")
+
     fname = os.path.join(out_dir, f"{label}_{int(jd_start * 1e5)}.npz")
     np.savez(fname,
              spectra     = spectra,
@@ -70,34 +114,54 @@ def measure(label, nblocks=N_BLOCKS, out_dir="data", lo_freq=1400e6):
              center_freq = lo_freq,
              sample_rate = SAMPLE_RATE,
              nblocks     = nblocks,
-             nsamples    = NSAMPLES)
+             nsamples    = NSAMPLES,
+             gain        = gain,
+             **(levels or {}),
+             **iq_stats)
 
     print(f"  → Saved: {fname}")
     return spectra, fname
 
 
-def observe_frequency_switch(nblocks=500, out_dir="data"):
+def observe_frequency_switch(nblocks=500, out_dir="data", server=None, gain="auto"):
     print("=== FREQUENCY SWITCHED OBSERVATION ===")
     print("Set upstream LO to POSITION 1 (line in upper half). Type LO frequency (hz):")
     lo1 = float(input())
-    s_on, f_on   = measure("son",  nblocks=nblocks, out_dir=out_dir, lo_freq=lo1)
+    iq_state = iqbalance.new_state()
+    s_on, f_on   = measure("son",  nblocks=nblocks, out_dir=out_dir, lo_freq=lo1, gain=gain,
+                           iq_state=iq_state, server=server)
 
     print("\nSwitch upstream LO to POSITION 2 (line in lower half). Type LO frequency (hz):")
     lo2 = float(input())
-    s_off, f_off = measure("soff", nblocks=nblocks, out_dir=out_dir, lo_freq=lo2)
+    gain = float(np.load(f_on)["gain"])
+    s_off, f_off = measure("soff", nblocks=nblocks, out_dir=out_dir, lo_freq=lo2, gain=gain,
+                           iq_state=iq_state, server=server)
 
     return s_on, s_off
 
-def observe_calibration(nblocks=50, out_dir="data"):
+def observe_calibration(nblocks=50, out_dir="data", gain="auto", lo_freq=None):
     print("\n=== CALIBRATION: COLD SKY ===")
+    if lo_freq is None:
+        # the gain is per channel, so calibrate at the LO the line is observed at
+        print("Set upstream LO as for the line observation. Type LO frequency (hz):")
+        lo_freq = float(input())
     print("Horn at zenith, aperture clear. Press Enter.")
     input()
-    s_cold, f_cold = measure("scold", nblocks=nblocks, out_dir=out_dir)
+    iq_state = iqbalance.new_state()
+    s_cold, f_cold = measure("scold", nblocks=nblocks, out_dir=out_dir, lo_freq=lo_freq,
+                             gain=gain, iq_state=iq_state)
 
     print("\n=== CALIBRATION: BLACKBODY ===")
     print("Fill horn aperture with people (~300K). Press Enter.")
     input()
-    s_cal, f_cal   = measure("scal",  nblocks=nblocks, out_dir=out_dir)
+    # hot load reuses the cold-sky gain so the Y-factor is not rescaled
+    gain = float(np.load(f_cold)["gain"])
+    s_cal, f_cal   = measure("scal",  nblocks=nblocks, out_dir=out_dir, lo_freq=lo_freq,
+                             gain=gain, iq_state=iq_state)
+
+    entry = calibration.solve_files(f_cold, f_cal)
+    print(f"  median Tsys={np.nanmedian(entry['tsys']):.1f} K")
+    calibration.add_to_cache(entry, path=os.path.join(out_dir, "cal_cache.npz"))
 
     return s_cold, s_cal
 
@@ -108,15 +172,23 @@ if __name__ == "__main__":
     p.add_argument("--mode", choices=["check", "line", "cal", "all"], default="check")
     p.add_argument("--nblocks",     type=int, default=500)
     p.add_argument("--nblocks_cal", type=int, default=50)
+    p.add_argument("--lo_cal",      type=float, default=None, help="calibration LO (Hz); prompted if omitted")
     p.add_argument("--outdir",      default="data")
+    p.add_argument("--stream",      type=int, default=None, help="publish live spectra on this port")
+    p.add_argument("--gain",        default="auto",
+                   help='SDR gain in dB; "auto" = calibration cache gain, else ranged; "range" = always range')
     args = p.parse_args()
+    gain = args.gain if args.gain in ("auto", "range") else float(args.gain)
 
     if args.mode in ("check", "all"):
         print("Opening SDR for level check...")
         try:
             s = make_sdr()
+            autogain.auto_gain(s, nsamples=NSAMPLES)
             raw = s.capture_data(nblocks=1, nsamples=NSAMPLES)
             check_levels(raw[0])
+            g, ph = iqbalance.params(iqbalance.moments(raw[0]))
+            print(f"  IQ: gain={g:.4f}  phase={np.degrees(ph):.2f} deg  IRR={iqbalance.irr_db(g, ph):.1f} dB")
             s.close()
             print("Hardware check passed.")
         except Exception as e:
@@ -124,7 +196,16 @@ if __name__ == "__main__":
             raise SystemExit(1)
 
     if args.mode in ("line", "all"):
-        observe_frequency_switch(nblocks=args.nblocks, out_dir=args.outdir)
+        server = None
+        if args.stream:
+            import stream
+            server = stream.SpectraServer(port=args.stream)
+        try:
+            observe_frequency_switch(nblocks=args.nblocks, out_dir=args.outdir, server=server, gain=gain)
+        finally:
+            if server is not None:
+                server.close()
 
     if args.mode in ("cal", "all"):
-        observe_calibration(nblocks=args.nblocks_cal, out_dir=args.outdir)
\ No newline at end of file
+        observe_calibration(nblocks=args.nblocks_cal, out_dir=args.outdir, gain=gain,
+                            lo_freq=args.lo_cal)
\ No newline at end of file
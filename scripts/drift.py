@@ -0,0 +1,170 @@
+import numpy as np
+import ugradio.timing as timing
+import os
+import time
+import autogain
+from data_collection import make_sdr, power_spectrum, freq_axis, NSAMPLES, SAMPLE_RATE
+
+HI_FREQ   = 1420.405752e6
+DUMP_SEC  = 10.0
+DRIFT_LO  = HI_FREQ - 1e6    # keep the line off the DC / LO-leakage bin
+LINE_WIDTH  = 300e3          # Hz integrated by line_intensity / --read
+BASELINE_HZ = 200e3          # Hz of baseline taken on either side of the line
+
+# A drift dataset is a directory:
+#   header.npz   freqs_hz, center_freq, sample_rate, nsamples, dump_sec, gain
+#   spectra.f32  raw float32 rows, one nchan-long spectrum per dump
+#   times.f64    raw float64 rows of (jd_start, jd_end, jd_mid, lst_mid, nblocks),
+#                lst_mid in radians as returned by ugradio.timing.lst
+# Both row files are only ever appended to, so a run can be stopped and
+# restarted into the same dataset and readers can memmap them mid-run.
+# Reopening trims any dump left half-written by an interrupted run.
+TIME_COLS = ("jd_start", "jd_end", "jd_mid", "lst_mid", "nblocks")
+
+def lo_clear(lo_freq, width=LINE_WIDTH, baseline_hz=BASELINE_HZ):
+    """True if the DC bin at lo_freq falls outside the line window and its baselines."""
+    return abs(lo_freq - HI_FREQ) > width / 2 + baseline_hz
+
+def create(path, center_freq, gain, dump_sec=DUMP_SEC, nsamples=NSAMPLES, width=LINE_WIDTH):
+    """Writes the header for a new dataset, or checks it against an existing one."""
+    if not lo_clear(center_freq, width):
+        raise ValueError(f"LO {center_freq/1e6:.3f} MHz puts the DC bin inside the "
+                         f"{width/1e3:.0f} kHz line window — offset the LO")
+    os.makedirs(path, exist_ok=True)
+    hdr = os.path.join(path, "header.npz")
+    if os.path.exists(hdr):
+        d = np.load(hdr)
+        if (int(d["nsamples"]) != nsamples or float(d["center_freq"]) != center_freq
+                or float(d["gain"]) != gain):
+            raise ValueError(f"{path} was recorded with a different setup")
+        repair(path, nsamples)
+        return
+    np.savez(hdr,
+             freqs_hz    = freq_axis(center_freq, nsamples=nsamples),
+             center_freq = center_freq,
+             sample_rate = SAMPLE_RATE,
+             nsamples    = nsamples,
+             dump_sec    = dump_sec,
+             gain        = gain)
+
+def header_gain(path):
+    """SDR gain of an existing dataset, or None for a new one."""
+    hdr = os.path.join(path, "header.npz")
+    return float(np.load(hdr)["gain"]) if os.path.exists(hdr) else None
+
+def repair(path, nchan):
+    """Truncates both row files to the last dump present in full in each, so appends stay aligned."""
+    files = {os.path.join(path, "spectra.f32"): 4 * nchan,
+             os.path.join(path, "times.f64"):   8 * len(TIME_COLS)}
+    sizes = {f: os.path.getsize(f) if os.path.exists(f) else 0 for f in files}
+    ndump = min(sizes[f] // row for f, row in files.items())
+    for f, row in files.items():
+        if sizes[f] != ndump * row:
+            print(f"  Truncating {f} to {ndump} complete dumps")
+            os.truncate(f, ndump * row)
+
+def append(path, spectrum, times):
+    with open(os.path.join(path, "spectra.f32"), "ab") as f:
+        f.write(np.asarray(spectrum, dtype=np.float32).tobytes())
+    with open(os.path.join(path, "times.f64"), "ab") as f:
+        f.write(np.asarray(times, dtype=np.float64).tobytes())
+
+def drift_scan(path, duration_sec, dump_sec=DUMP_SEC, lo_freq=DRIFT_LO, gain="auto",
+               width=LINE_WIDTH):
+    """Emits one averaged spectrum every dump_sec until duration_sec has elapsed."""
+    if not lo_clear(lo_freq, width):
+        raise ValueError(f"LO {lo_freq/1e6:.3f} MHz puts the DC bin inside the "
+                         f"{width/1e3:.0f} kHz line window — offset the LO")
+    if gain == "auto" and header_gain(path) is not None:
+        gain = header_gain(path)                    # keep one scale across appended runs
+    if gain == "auto":
+        s = make_sdr(center_freq=lo_freq)
+        gain, _ = autogain.auto_gain(s, nsamples=NSAMPLES)
+    else:
+        s = make_sdr(center_freq=lo_freq, gain=gain)
+    t_stop = time.time() + duration_sec
+    ndump = 0
+    try:
+        create(path, lo_freq, gain, dump_sec, width=width)
+        while time.time() < t_stop:
+            jd_start = timing.julian_date()
+            t_dump   = time.time() + dump_sec
+            acc, n   = np.zeros(NSAMPLES), 0
+            while time.time() < t_dump:
+                try:
+                    raw = s.capture_data(nblocks=1, nsamples=NSAMPLES)
+                    acc += power_spectrum(raw[0])
+                    n += 1
+                except Exception as e:
+                    print(f"  Dump {ndump} block error: {e} — skipped")
+            jd_end = timing.julian_date()
+            jd_mid = 0.5 * (jd_start + jd_end)
+            lst    = timing.lst(jd_mid)
+            spec   = acc / n if n else np.full(NSAMPLES, np.nan)
+            append(path, spec, (jd_start, jd_end, jd_mid, lst, n))
+            ndump += 1
+            print(f"  dump {ndump}: LST={lst * 12 / np.pi:.4f}h  blocks={n}")
+    finally:
+        s.close()
+    print(f"  → {ndump} dumps appended to {path}")
+    return ndump
+
+# ---- readers ----
+
+def load(path):
+    """Returns (header, times, spectra) with spectra memmapped as (ndump, nchan)."""
+    hdr   = np.load(os.path.join(path, "header.npz"))
+    nchan = int(hdr["nsamples"])
+    times = np.fromfile(os.path.join(path, "times.f64"), dtype=np.float64)
+    # a dump interrupted mid-write leaves a partial row; ignore it
+    times = times[:times.size // len(TIME_COLS) * len(TIME_COLS)].reshape(-1, len(TIME_COLS))
+    spectra = np.memmap(os.path.join(path, "spectra.f32"), dtype=np.float32, mode="r")
+    ndump = min(len(times), spectra.size // nchan)
+    spectra = spectra[:ndump * nchan].reshape(ndump, nchan)
+    return hdr, times[:ndump], spectra
+
+def line_intensity(path, f_lo, f_hi, baseline_hz=BASELINE_HZ, chunk=4096):
+    """
+    Line-integrated intensity (power x Hz) between f_lo and f_hi for every dump,
+    with a per-dump constant baseline from baseline_hz on either side.
+    Reads the memmap in chunks of dumps so memory stays flat for long surveys.
+    Returns (lst_hours, intensity), sorted by LST.
+    """
+    hdr, times, spectra = load(path)
+    lo = float(hdr["center_freq"])
+    if f_lo - baseline_hz <= lo <= f_hi + baseline_hz:
+        print(f"  !! LO {lo/1e6:.3f} MHz lies inside the line/baseline window — DC spike included")
+    freqs = hdr["freqs_hz"]
+    dnu   = abs(freqs[1] - freqs[0])
+    line  = (freqs >= f_lo) & (freqs <= f_hi)
+    base  = (((freqs >= f_lo - baseline_hz) & (freqs < f_lo)) |
+             ((freqs > f_hi) & (freqs <= f_hi + baseline_hz)))
+
+    intensity = np.empty(len(spectra))
+    for i in range(0, len(spectra), chunk):
+        block = np.asarray(spectra[i:i+chunk], dtype=np.float64)
+        bl    = np.nanmean(block[:, base], axis=1) if base.any() else 0.0
+        intensity[i:i+chunk] = (np.nansum(block[:, line], axis=1) - bl * line.sum()) * dnu
+
+    lst   = times[:, TIME_COLS.index("lst_mid")] * 12 / np.pi
+    order = np.argsort(lst)
+    return lst[order], intensity[order]
+
+if __name__ == "__main__":
+    import argparse
+    p = argparse.ArgumentParser()
+    p.add_argument("path", help="dataset directory (created or appended to)")
+    p.add_argument("--hours",   type=float, default=1.0)
+    p.add_argument("--dump",    type=float, default=DUMP_SEC, help="seconds per dump")
+    p.add_argument("--lo",      type=float, default=DRIFT_LO)
+    p.add_argument("--read",    action="store_true", help="print intensity vs LST instead of observing")
+    p.add_argument("--width",   type=float, default=LINE_WIDTH, help="line window (Hz)")
+    args = p.parse_args()
+
+    if args.read:
+        lst, inten = line_intensity(args.path, HI_FREQ - args.width/2, HI_FREQ + args.width/2)
+        for l, v in zip(lst, inten):
+            print(f"{l:8.4f}  {v:.6e}")
+    else:
+        drift_scan(args.path, args.hours * 3600, dump_sec=args.dump, lo_freq=args.lo,
+                   width=args.width)
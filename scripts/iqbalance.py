@@ -0,0 +1,117 @@
+import numpy as np
+
+# Blind IQ-imbalance estimation from second moments. With the Q arm scaled by
+# g and rotated by phi relative to I,
+#     E[Q^2]/E[I^2] = g^2          E[IQ]/sqrt(E[I^2]E[Q^2]) = -sin(phi)
+# for any circular sky signal, so the running moments of the captures are
+# enough to track (g, phi) and undo it before the FFT.
+
+MIN_SAMPLES   = 2 ** 17      # accumulate this much IQ before trusting (g, phi)
+HOLDOUT_EVERY = 10           # every Nth block is kept out of the estimate to score it
+NSIGMA        = 3            # imbalance must exceed this many estimator sigmas to be corrected
+
+def new_state():
+    """
+    Running estimate for a session. Pass the same state to successive
+    measure() calls so the estimate keeps improving instead of restarting.
+    """
+    return {"est": None, "n": 0, "params": None, "frozen": False,
+            "held_raw": None, "held_fixed": None, "n_held": 0}
+
+def moments(iq):
+    """[E[I^2], E[Q^2], E[IQ]] after removing DC, over the last axis (vectorized over blocks)."""
+    iq = iq - iq.mean(axis=-1, keepdims=True)
+    i, q = iq.real, iq.imag
+    return np.stack([np.mean(i * i, axis=-1), np.mean(q * q, axis=-1), np.mean(i * q, axis=-1)], axis=-1)
+
+def _accumulate(mean, n, iq):
+    """Sample-weighted running mean of moments over one block or a stack of blocks."""
+    m = moments(iq)
+    k = iq.shape[-1]
+    if m.ndim > 1:
+        k *= m.shape[0]
+        m = m.mean(axis=0)
+    return (m if mean is None else (n * mean + k * m) / (n + k)), n + k
+
+def update(state, iq):
+    """Folds a block (or a stack of blocks) into the estimate."""
+    state["est"], state["n"] = _accumulate(state["est"], state["n"], iq)
+
+def ready(state):
+    return state["n"] >= MIN_SAMPLES
+
+def warmup_blocks(state, nsamples):
+    """Blocks still needed (of nsamples each) before the estimate reaches MIN_SAMPLES."""
+    return max(0, -(-(MIN_SAMPLES - state["n"]) // nsamples))
+
+def significant(state):
+    """
+    True if (g, phi) differs from a balanced receiver by more than the
+    estimator noise (~1/sqrt(n) in both g and sin phi); correcting an
+    already-balanced stream with a noisy estimate only adds imbalance.
+    """
+    g, ph = params(state["est"])
+    tol = NSIGMA / np.sqrt(state["n"])
+    return abs(g - 1) > tol or abs(np.sin(ph)) > tol
+
+def freeze(state):
+    """
+    Fixes the (g, phi) used for correction from the warmed-up estimate, or
+    None if the imbalance is within the estimator noise. Called once per
+    session, so every block of every file in it (e.g. both halves of a
+    son/soff or scold/scal pair) gets the same treatment.
+    """
+    if not state["frozen"]:
+        state["params"] = params(state["est"]) if significant(state) else None
+        state["frozen"] = True
+
+def process(state, iq, i):
+    """
+    Per-block stage for the capture loop, after warm-up and freeze(). Every
+    block is corrected with the frozen (g, phi). Every HOLDOUT_EVERY-th block
+    is scored instead of fitted: its raw and corrected moments are accumulated
+    separately, so the reported image rejection comes from data the estimate
+    never saw. The rest keep refining the estimate for the report.
+    """
+    fixed = correct(iq, *state["params"]) if state["params"] is not None else iq
+    if i % HOLDOUT_EVERY == 0:
+        n = state["n_held"]
+        state["held_raw"],   _ = _accumulate(state["held_raw"],   n, iq)
+        state["held_fixed"], state["n_held"] = _accumulate(state["held_fixed"], n, fixed)
+    else:
+        update(state, iq)
+    return fixed
+
+def params(m):
+    """(gain, phase) of the Q arm relative to I from a moments vector."""
+    ii, qq, iq = m
+    gain  = np.sqrt(qq / ii)
+    phase = -np.arcsin(np.clip(iq / np.sqrt(ii * qq), -1, 1))
+    return gain, phase
+
+def correct(iq, gain, phase):
+    """
+    Rebuilds an orthogonal, equal-power Q arm: Q' = (Q/g + I sin phi) / cos phi.
+    DC is left in place so corrected and uncorrected spectra share a DC bin.
+    """
+    i, q = iq.real, iq.imag
+    q = (q / gain + i * np.sin(phase)) / np.cos(phase)
+    return i + 1j * q
+
+def irr_db(gain, phase):
+    """Image rejection ratio (dB) implied by a gain/phase imbalance."""
+    num = 1 + 2 * gain * np.cos(phase) + gain ** 2
+    den = 1 - 2 * gain * np.cos(phase) + gain ** 2
+    return 10 * np.log10(num / max(den, 1e-30))
+
+def summary(state):
+    """Dict of the imbalance estimate and held-out image rejection before/after correction."""
+    if state["est"] is None:
+        return {}
+    g, ph = params(state["est"])
+    out = {"iq_gain": g, "iq_phase": ph, "iq_samples": state["n"],
+           "iq_corrected": state["params"] is not None}
+    if state["n_held"]:
+        out["irr_before_db"] = irr_db(*params(state["held_raw"]))
+        out["irr_after_db"]  = irr_db(*params(state["held_fixed"]))
+    return out
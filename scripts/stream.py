@@ -0,0 +1,190 @@
+import numpy as np
+import json
+import queue
+import socket
+import struct
+import threading
+import time
+
+PORT = 5055
+
+# Frame layout (little-endian, no pickling):
+#   b"NQSP"  u16 version  u32 meta_len  u32 narrays
+#   meta_len bytes of UTF-8 JSON metadata
+#   per array:  u16 name_len, name, u16 dtype_len, dtype.str, u8 ndim,
+#               ndim x u64 shape, then the raw C-ordered array bytes
+MAGIC      = b"NQSP"
+VERSION    = 1
+FRAME_HDR  = struct.Struct("<4sHII")
+
+def _encode_meta(meta):
+    return json.dumps(meta, default=lambda v: v.item() if hasattr(v, "item") else str(v)).encode()
+
+def frame_header(meta, arrays):
+    """Everything but the array payloads; those go out straight from the arrays' buffers."""
+    m = _encode_meta(meta)
+    parts = [FRAME_HDR.pack(MAGIC, VERSION, len(m), len(arrays)), m]
+    for name, a in arrays.items():
+        n, dt = name.encode(), a.dtype.str.encode()
+        parts.append(struct.pack("<H", len(n)) + n + struct.pack("<H", len(dt)) + dt
+                     + struct.pack(f"<B{a.ndim}Q", a.ndim, *a.shape))
+    return parts
+
+def send_frame(sock, meta, arrays):
+    arrays = {k: np.ascontiguousarray(v) for k, v in arrays.items()}
+    parts  = frame_header(meta, arrays)
+    sock.sendall(b"".join(parts[:2]))
+    for hdr, a in zip(parts[2:], arrays.values()):
+        sock.sendall(hdr)
+        sock.sendall(memoryview(a).cast("B"))
+
+def _recv_exact(sock, n):
+    buf  = bytearray(n)
+    view = memoryview(buf)
+    got  = 0
+    while got < n:
+        k = sock.recv_into(view[got:], n - got)
+        if k == 0:
+            raise ConnectionError("stream closed")
+        got += k
+    return buf
+
+def recv_frame(sock):
+    """Returns (meta, arrays); each array is a view on its own receive buffer (no copy)."""
+    magic, version, meta_len, narrays = FRAME_HDR.unpack(_recv_exact(sock, FRAME_HDR.size))
+    if magic != MAGIC or version != VERSION:
+        raise ValueError(f"Bad frame header {magic!r} v{version}")
+    meta = json.loads(_recv_exact(sock, meta_len).decode())
+    arrays = {}
+    for _ in range(narrays):
+        name  = _recv_exact(sock, struct.unpack("<H", _recv_exact(sock, 2))[0]).decode()
+        dtype = np.dtype(_recv_exact(sock, struct.unpack("<H", _recv_exact(sock, 2))[0]).decode())
+        ndim  = _recv_exact(sock, 1)[0]
+        shape = struct.unpack(f"<{ndim}Q", _recv_exact(sock, 8 * ndim))
+        nbytes = int(np.prod(shape, dtype=np.int64)) * dtype.itemsize
+        arrays[name] = np.frombuffer(_recv_exact(sock, nbytes), dtype=dtype).reshape(shape)
+    return meta, arrays
+
+# ---- server (acquisition side) ----
+
+QUEUE_FRAMES = 8             # frames buffered per client before it is dropped as too slow
+SEND_TIMEOUT = 5.0           # seconds a single send may stall before the client is dropped
+
+class SpectraServer:
+    """
+    Accepts any number of analysis clients on a background thread. Each client
+    gets a bounded queue and its own sender thread, so publish() only enqueues
+    and never waits on the network; a client whose queue fills or whose send
+    stalls is dropped.
+    """
+    def __init__(self, host="0.0.0.0", port=PORT):
+        self.sock = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+        self.sock.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+        self.sock.bind((host, port))
+        self.sock.listen()
+        self.port = self.sock.getsockname()[1]
+        self.clients = {}
+        self.lock = threading.Lock()
+        threading.Thread(target=self._accept, daemon=True).start()
+        print(f"  Streaming spectra on port {self.port}")
+
+    def _accept(self):
+        while True:
+            try:
+                c, addr = self.sock.accept()
+            except OSError:
+                return
+            c.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+            c.settimeout(SEND_TIMEOUT)
+            q = queue.Queue(maxsize=QUEUE_FRAMES)
+            with self.lock:
+                self.clients[c] = q
+            threading.Thread(target=self._send_loop, args=(c, q), daemon=True).start()
+            print(f"  Stream client connected: {addr[0]}:{addr[1]}")
+
+    def _send_loop(self, c, q):
+        while True:
+            frame = q.get()
+            if frame is None:
+                break
+            try:
+                send_frame(c, *frame)
+            except (OSError, TypeError, ValueError):
+                break
+        self._drop(c)
+
+    def _drop(self, c):
+        with self.lock:
+            q = self.clients.pop(c, None)
+        if q is not None:
+            c.close()
+            try:
+                q.put_nowait(None)              # wake the sender if it is waiting
+            except queue.Full:
+                pass
+
+    def publish(self, meta, arrays):
+        # arrays are copied once so the caller may keep writing into its buffers
+        frame = (dict(meta), {k: np.array(v) for k, v in arrays.items()})
+        with self.lock:
+            clients = list(self.clients.items())
+        for c, q in clients:
+            try:
+                q.put_nowait(frame)
+            except queue.Full:
+                print("  Stream client too slow — dropped")
+                self._drop(c)
+
+    def close(self):
+        self.sock.close()
+        with self.lock:
+            clients = list(self.clients)
+        for c in clients:
+            self._drop(c)
+
+# ---- client (analysis side) ----
+
+def frames(host="localhost", port=PORT):
+    """Yields (meta, arrays) until the server goes away."""
+    with socket.create_connection((host, port)) as sock:
+        while True:
+            try:
+                yield recv_frame(sock)
+            except ConnectionError:
+                return
+
+def as_npz(meta, arrays):
+    """Merges a frame into one dict shaped like np.load() of a data_collection file."""
+    d = dict(meta)
+    d.update(arrays)
+    return d
+
+if __name__ == "__main__":
+    import argparse
+    p = argparse.ArgumentParser()
+    p.add_argument("mode", choices=["listen", "demo"],
+                   help="listen: print/save incoming frames; demo: publish noise spectra")
+    p.add_argument("--host", default="localhost")
+    p.add_argument("--port", type=int, default=PORT)
+    p.add_argument("--save", action="store_true", help="write each frame to <label>_live.npz")
+    args = p.parse_args()
+
+    if args.mode == "demo":
+        srv = SpectraServer(port=args.port)
+        freqs = np.fft.fftshift(np.fft.fftfreq(2048, 1 / 2.4e6)) + 1420e6
+        acc = np.zeros(2048)
+        try:
+            for i in range(1, 10 ** 6):
+                acc += np.random.exponential(size=2048)
+                srv.publish({"label": "demo", "block": i, "center_freq": 1420e6},
+                            {"spectra": (acc / i)[None, :], "freqs_hz": freqs})
+                time.sleep(0.5)
+        finally:
+            srv.close()
+    else:
+        for meta, arrays in frames(args.host, args.port):
+            d = as_npz(meta, arrays)
+            print(f"[{meta.get('label')}] block {meta.get('block')}  "
+                  f"mean power={np.nanmean(d['spectra']):.4e}")
+            if args.save:
+                np.savez(f"{meta.get('label')}_live.npz", **d)
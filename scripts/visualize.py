@@ -1,6 +1,7 @@
 import numpy as np
 import matplotlib.pyplot as plt
 import os
+import calibration
 
 HI_FREQ    = 1420.405752e6
 C_LIGHT    = 3e5             # km/s
@@ -79,7 +80,7 @@ def plot_line_shape(d_on, d_off, smooth_n=10):
     r_smooth = smooth(s_on_m / s_off_m, smooth_n)
     vels     = freq_to_velocity(freqs)
 
-    fig, (ax1, ax2) = plt.subplots(1, 1, figsize=(10, 8))
+    fig, ax1 = plt.subplots(1, 1, figsize=(10, 8))
     fig.suptitle("Bandpass-Corrected Line Shape  (r = s_on / s_off)", fontsize=14)
 
     ax1.plot(freqs/1e6, r_smooth, color="steelblue")
@@ -95,6 +96,33 @@ def plot_line_shape(d_on, d_off, smooth_n=10):
     plt.show()
     print("Saved: plot_line_shape.png")
 
+def plot_line_temperature(d_on, d_off, cache, smooth_n=10):
+    jd_mid     = 0.5 * (float(d_on["jd_mid"]) + float(d_off["jd_mid"]))
+    if float(d_on["gain"]) != float(d_off["gain"]):
+        raise ValueError("s_on and s_off were taken at different SDR gains")
+    lo_mid     = 0.5 * (float(d_on["center_freq"]) + float(d_off["center_freq"]))
+    gain, tsys = calibration.interpolate(jd_mid, cache, float(d_on["gain"]),
+                                         len(d_on["freqs_hz"]), lo_mid)
+    s_on_m, _  = average_spectra(d_on["spectra"])
+    s_off_m, _ = average_spectra(d_off["spectra"])
+
+    t_line = smooth(calibration.line_temperature(s_on_m, s_off_m, gain), smooth_n)
+    freqs  = d_on["freqs_hz"]
+    print(f"Calibration at JD={jd_mid:.6f}: median Tsys={np.nanmedian(tsys):.1f} K")
+
+    fig, ax = plt.subplots(1, 1, figsize=(10, 5))
+    ax.plot(freqs/1e6, t_line, color="steelblue")
+    ax.axhline(0.0, color="gray", ls="--", lw=0.8)
+    ax.set_title("Calibrated Line  (s_on - s_off) / G")
+    ax.set_xlabel("Frequency (MHz)")
+    ax.set_ylabel("T_B (K)")
+    ax.grid(True, alpha=0.3)
+
+    plt.tight_layout()
+    plt.savefig("plot_line_temperature.png", dpi=150)
+    plt.show()
+    print("Saved: plot_line_temperature.png")
+
 if __name__ == "__main__":
     import argparse
     p = argparse.ArgumentParser()
@@ -103,6 +131,7 @@ if __name__ == "__main__":
     #p.add_argument("--scold", required=True, help="path to scold .npz file")
     #p.add_argument("--scal",  required=True, help="path to scal .npz file")
     p.add_argument("--smooth", type=int, default=10)
+    p.add_argument("--calcache", default=None, help="path to cal_cache.npz from calibration.py")
     args = p.parse_args()
 
     d_on   = load_npz(args.son)
@@ -112,4 +141,11 @@ if __name__ == "__main__":
 
     #plot_raw_data(d_on, d_off, d_cold, d_cal, smooth_n=args.smooth)
     plot_raw(d_on, d_off, smooth_n=args.smooth)
-    plot_line_shape(d_on, d_off, smooth_n=args.smooth)
\ No newline at end of file
+    plot_line_shape(d_on, d_off, smooth_n=args.smooth)
+
+    if args.calcache:
+        cache = calibration.load_cache(args.calcache)
+        if cache is None:
+            print(f"No calibration cache at {args.calcache} — skipping T_B plot")
+        else:
+            plot_line_temperature(d_on, d_off, cache, smooth_n=args.smooth)
@@ -0,0 +1,155 @@
+import numpy as np
+import ugradio.timing as timing
+import os
+from functools import lru_cache
+import autogain
+from data_collection import make_sdr, SAMPLE_RATE
+
+HI_FREQ    = 1420.405752e6
+DECIM      = 8               # 2.4 MHz -> 300 kHz around the line
+NFFT       = 1024            # zoomed channels (~293 Hz each at DECIM=8)
+TAPS_PER   = 16              # FIR taps per polyphase branch
+CUTOFF     = 0.8             # passband edge as a fraction of the decimated Nyquist
+N_BLOCKS   = 200
+
+# Against a plain FFT at the same channel width this stores decim x fewer
+# channels, and the polyphase decimator below (TAPS_PER matrix-vector
+# products over the block) plus the short FFT also runs faster than the one
+# long FFT.
+
+# Filter taps and output phasors depend only on the setup, so they are built
+# once and reused for every block (arrays are read-only since they are shared).
+
+@lru_cache(maxsize=8)
+def lowpass(decim=DECIM, taps_per=TAPS_PER):
+    """
+    Hann-windowed sinc anti-alias filter with its cutoff at CUTOFF x the
+    decimated Nyquist, so the transition band is attenuated before it folds in.
+    """
+    n = decim * taps_per + 1
+    k = np.arange(n) - (n - 1) / 2
+    h = np.sinc(k * CUTOFF / decim) * np.hanning(n)
+    h /= h.sum()
+    h.flags.writeable = False
+    return h
+
+@lru_cache(maxsize=8)
+def bandpass(offset_hz, decim=DECIM, nfft=NFFT, rate=SAMPLE_RATE):
+    """
+    The mixer folded into the filter: complex taps g centred on offset_hz, and
+    the exp(-2 pi i f t) phasor evaluated only at the nfft decimated outputs.
+    Saves mixing every input sample.
+    """
+    h = lowpass(decim)
+    w = 2 * np.pi * offset_hz / rate
+    g = h[::-1] * np.exp(-1j * w * np.arange(len(h)))
+    p = np.exp(-1j * w * decim * np.arange(nfft))
+    # polyphase layout: branch t holds taps t*decim .. t*decim + decim - 1
+    branches = -(-len(g) // decim)
+    gp = np.zeros(branches * decim, dtype=complex)
+    gp[:len(g)] = g
+    gp = gp.reshape(branches, decim)
+    gp.flags.writeable = p.flags.writeable = False
+    return gp, p
+
+def capture_len(decim=DECIM, nfft=NFFT, taps_per=TAPS_PER):
+    """Raw samples needed for nfft decimated outputs, rounded up to the SDR's 512 multiple."""
+    branches = -(-len(lowpass(decim, taps_per)) // decim)
+    n = decim * (nfft + branches - 1)
+    return -(-n // 512) * 512
+
+def downconvert(iq, offset_hz, decim=DECIM, nfft=NFFT, rate=SAMPLE_RATE):
+    """
+    Mixes iq to baseband at offset_hz and decimates with the cached FIR.
+    Only every decim-th output is computed: the block is viewed as rows of
+    decim samples and each polyphase branch is one matrix-vector product over
+    shifted rows, so the filter costs len(h) MACs per output.
+    """
+    gp, p = bandpass(offset_hz, decim, nfft, rate)
+    branches = len(gp)
+    rows = iq[:(nfft + branches - 1) * decim].reshape(-1, decim)
+    y = rows[:nfft] @ gp[0]
+    for t in range(1, branches):
+        y += rows[t:t + nfft] @ gp[t]
+    return y * p
+
+def zoom_spectrum(iq, offset_hz, decim=DECIM, nfft=NFFT):
+    z = downconvert(iq, offset_hz, decim, nfft)
+    return np.abs(np.fft.fftshift(np.fft.fft(z * np.hanning(len(z)), n=nfft))) ** 2
+
+def zoom_valid(decim=DECIM, nfft=NFFT):
+    """Channels inside the filter passband; the rolled-off edges are False."""
+    f = np.fft.fftshift(np.fft.fftfreq(nfft))     # cycles per decimated sample
+    return np.abs(f) <= CUTOFF / 2
+
+def zoom_freq_axis(lo_freq, offset_hz, decim=DECIM, nfft=NFFT, rate=SAMPLE_RATE):
+    return np.fft.fftshift(np.fft.fftfreq(nfft, decim / rate)) + lo_freq + offset_hz
+
+def measure(label, lo_freq, line_freq=HI_FREQ, nblocks=N_BLOCKS, out_dir="data",
+            decim=DECIM, nfft=NFFT, gain="auto"):
+    """Like data_collection.measure, but stores only the zoomed sub-band around line_freq."""
+    os.makedirs(out_dir, exist_ok=True)
+    offset = line_freq - lo_freq
+    if abs(offset) + SAMPLE_RATE / decim / 2 > SAMPLE_RATE / 2:
+        raise ValueError(f"Zoom band at {offset/1e3:.0f} kHz falls outside the SDR band")
+    nsamples = capture_len(decim, nfft)
+
+    jd_start  = timing.julian_date()
+    lst_start = timing.lst()
+    print(f"\n[{label}] zoom x{decim} at {line_freq/1e6:.4f} MHz  "
+          f"({SAMPLE_RATE/decim/nfft:.0f} Hz channels)  LST={lst_start:.4f}")
+
+    if gain == "auto":
+        s = make_sdr(center_freq=lo_freq)
+        gain, levels = autogain.auto_gain(s, nsamples=nsamples)
+    else:
+        s = make_sdr(center_freq=lo_freq, gain=gain)
+        levels = {}
+
+    spectra = np.zeros((nblocks, nfft))
+    for i in range(nblocks):
+        try:
+            raw = s.capture_data(nblocks=1, nsamples=nsamples)
+            spectra[i] = zoom_spectrum(raw[0], offset, decim, nfft)
+        except Exception as e:
+            print(f"  Block {i} error: {e} — NaN inserted")
+            spectra[i] = np.nan
+
+    s.close()
+    jd_end = timing.julian_date()
+
+    fname = os.path.join(out_dir, f"{label}_zoom_{int(jd_start * 1e5)}.npz")
+    np.savez(fname,
+             spectra     = spectra,
+             freqs_hz    = zoom_freq_axis(lo_freq, offset, decim, nfft),
+             jd_start    = jd_start,
+             jd_end      = jd_end,
+             jd_mid      = 0.5 * (jd_start + jd_end),
+             lst_start   = lst_start,
+             center_freq = lo_freq,
+             zoom_freq   = line_freq,
+             sample_rate = SAMPLE_RATE / decim,
+             decim       = decim,
+             nblocks     = nblocks,
+             nsamples    = nfft,
+             zoom_valid  = zoom_valid(decim, nfft),
+             gain        = gain,
+             **levels)
+
+    print(f"  → Saved: {fname}")
+    return spectra, fname
+
+if __name__ == "__main__":
+    import argparse
+    p = argparse.ArgumentParser()
+    p.add_argument("--label",   default="szoom")
+    p.add_argument("--lo",      type=float, required=True, help="SDR LO frequency (Hz)")
+    p.add_argument("--line",    type=float, default=HI_FREQ)
+    p.add_argument("--nblocks", type=int, default=N_BLOCKS)
+    p.add_argument("--decim",   type=int, default=DECIM)
+    p.add_argument("--nfft",    type=int, default=NFFT)
+    p.add_argument("--outdir",  default="data")
+    args = p.parse_args()
+
+    measure(args.label, args.lo, line_freq=args.line, nblocks=args.nblocks,
+            out_dir=args.outdir, decim=args.decim, nfft=args.nfft)